@@ -79,16 +79,18 @@ def marginal_calcs_2d(jpd_data, as_dict=True):
     inta, intb = jpd_data.shape
     na = np.arange(inta)
     nb = np.arange(intb)
-    ns = np.sum(jpd_data, axis=1) @ na
-    ni = np.sum(jpd_data, axis=0) @ nb
-    ns2 = np.sum(jpd_data, axis=1) @ (na ** 2)
-    ni2 = np.sum(jpd_data, axis=0) @ (nb ** 2)
+    ps_s = np.sum(jpd_data, axis=1)
+    ps_i = np.sum(jpd_data, axis=0)
+    ns = ps_s @ na
+    ni = ps_i @ nb
+    ns2 = ps_s @ (na ** 2)
+    ni2 = ps_i @ (nb ** 2)
+    nsi = na @ jpd_data @ nb
     g2s = (ns2 - ns) / ns ** 2
     g2i = (ni2 - ni) / ni ** 2
-    g11 = (na @ jpd_data @ nb) / (ns * ni)
-    nrf = np.sum([[((i - j) ** 2) * jpd_data[i, j] for i in range(inta)] for j in range(intb)])
-    nrf -= np.sum([[(i - j) * jpd_data[i, j] for i in range(inta)] for j in range(intb)]) ** 2
-    nrf /= ns + ni
+    g11 = nsi / (ns * ni)
+    # The variance of the photon number difference follows from the moments above
+    nrf = (ns2 + ni2 - 2 * nsi - (ns - ni) ** 2) / (ns + ni)
     if as_dict is True:
         return {
             "n_s": ns,
@@ -106,17 +108,24 @@ def gen_hist_2d(beam1, beam2):
 
     Args:
         beam1 (array): 1D events array containing the raw click events of first beam
-        beam2 (array): 1D events array containing the raw click events of second beam
+        beam2 (array): 1D events array containing the raw click events of second beam;
+            it must have the same shape as beam1 and both beams must only contain
+            non-negative photon numbers
 
     Returns:
         array: probability mass function of the click patterns for the two beams
     """
-    nx = np.max(beam1)
-    ny = np.max(beam2)
-    xedges = np.arange(nx + 2)
-    yedges = np.arange(ny + 2)
-    mass_fun, _, _ = np.histogram2d(beam1, beam2, bins=(xedges, yedges), normed=True)
-    return mass_fun
+    beam1 = np.asarray(beam1).astype(np.int64)
+    beam2 = np.asarray(beam2).astype(np.int64)
+    if beam1.shape != beam2.shape:
+        raise ValueError("The two beams must contain the same number of events.")
+    if np.min(beam1) < 0 or np.min(beam2) < 0:
+        raise ValueError("The photon numbers of the events must be non-negative.")
+    nx = np.max(beam1) + 1
+    ny = np.max(beam2) + 1
+    # Every pair of events is mapped to a single flat bin, so one counting pass suffices
+    counts = np.bincount(beam1 * ny + beam2, minlength=nx * ny)
+    return counts.reshape(nx, ny) / beam1.size
 
 
 def threshold_2d(ps, nmax, mmax):
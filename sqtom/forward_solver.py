@@ -28,10 +28,9 @@ Phys. Rev. A 95, 053806 (2017)
 
 
 import numpy as np
-from scipy.stats import poisson, geom
+from scipy.stats import poisson
 from scipy.signal import convolve2d
 from thewalrus.quantum import loss_mat
-from thewalrus.quantum.photon_number_distributions import _squeezed_state_distribution
 
 
 def twinbeam_pmf(params, cutoff=50, sq_label="sq_", noise_label="noise"):
@@ -85,16 +84,11 @@ def twinbeam_pmf(params, cutoff=50, sq_label="sq_", noise_label="noise"):
         loss_mat_ni = loss_mat(eta_i, cutoff)
         twin_pmf = np.zeros([cutoff, cutoff])
         twin_pmf[0, 0] = 1.0
+        n_pairs = np.arange(cutoff)
         for nmean in sq:
-            twin_pmf = convolve2d(
-                twin_pmf,
-                np.diag(
-                    geom.pmf(
-                        np.arange(1, cutoff + 1),
-                        1 / (1.0 + nmean),
-                    )
-                ),
-            )[0:cutoff, 0:cutoff]
+            # Each twin beam has a geometric pair number distribution p (1 - p)^n
+            p = 1 / (1.0 + nmean)
+            twin_pmf = convolve2d(twin_pmf, np.diag(p * (1.0 - p) ** n_pairs))[0:cutoff, 0:cutoff]
         twin_pmf = loss_mat_ns @ twin_pmf @ loss_mat_ni
         joint_pmf = convolve2d(twin_pmf, joint_pmf)[:cutoff, :cutoff]
 
@@ -132,10 +126,13 @@ def degenerate_pmf(params, cutoff=50, sq_label="sq_", noise_label="noise"):
         n_modes = int(params["n_modes"])
         sq = [float(params[sq_label + str(i)]) for i in range(n_modes)]
         mat = loss_mat(float(eta), cutoff)
+        # A squeezer with mean photon number n emits 2k photons with probability
+        # c_k (n / (1 + n))^k / sqrt(1 + n), where c_k = (2k)! / (2^k k!)^2 is shared by all modes
+        n_pairs = np.arange((cutoff + 1) // 2)
+        c_k = np.cumprod(np.append(1.0, (2.0 * n_pairs[1:] - 1.0) / (2.0 * n_pairs[1:])))
+        sq_pmf = np.zeros(cutoff)
         for n_val in sq:
-            ps = np.convolve(
-                ps,
-                _squeezed_state_distribution(np.arcsinh(np.sqrt(n_val)), cutoff=cutoff) @ mat,
-            )[:cutoff]
+            sq_pmf[0::2] = c_k * (n_val / (1.0 + n_val)) ** n_pairs / np.sqrt(1.0 + n_val)
+            ps = np.convolve(ps, sq_pmf @ mat)[:cutoff]
 
     return ps[:cutoff]
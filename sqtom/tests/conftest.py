@@ -0,0 +1,94 @@
+# Copyright 2019-2020 Xanadu Quantum Technologies Inc.
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Shared fixtures for the sqtom tests"""
+
+import functools
+import numpy as np
+import pytest
+from sqtom import forward_solver
+from sqtom.fitting_1d import marginal_calcs_1d
+from sqtom.fitting_2d import marginal_calcs_2d, gen_hist_2d
+
+
+@pytest.fixture
+def rng():
+    """Returns a freshly seeded random number generator.
+
+    Each test gets its own generator so that the samples it draws do not depend on which tests
+    ran before it in the same process, e.g. when the suite is distributed with pytest-xdist.
+    """
+    return np.random.default_rng(1234)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cached_loss_mat():
+    """Memoizes the loss matrices used by the forward solvers for the whole test session.
+
+    The tests only use a handful of distinct ``(eta, cutoff)`` pairs, so every repeated pair
+    is served from memory. The cached matrices are made read-only since they are shared
+    between calls.
+    """
+    loss_mat = forward_solver.loss_mat
+
+    @functools.lru_cache(maxsize=64)
+    def _loss_mat(eta, cutoff):
+        mat = loss_mat(eta, cutoff)
+        mat.setflags(write=False)
+        return mat
+
+    forward_solver.loss_mat = _loss_mat
+    yield _loss_mat
+    forward_solver.loss_mat = loss_mat
+
+
+@pytest.fixture(scope="session")
+def pmf_cache():
+    """Returns a memoized version of ``twinbeam_pmf`` shared by the whole test session.
+
+    Tests that only differ in how the pmf is used, e.g. which parameters are held fixed in a
+    fit, get the same read-only array instead of recomputing it.
+    """
+    cache = {}
+
+    def _twinbeam_pmf(params, cutoff=50):
+        key = (frozenset(params.items()), cutoff)
+        if key not in cache:
+            pmf = forward_solver.twinbeam_pmf(params, cutoff=cutoff)
+            pmf.setflags(write=False)
+            cache[key] = pmf
+        return cache[key]
+
+    return _twinbeam_pmf
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warmup():
+    """Exercises the solvers once on tiny inputs before any test runs.
+
+    The loss matrices are built by a numba-compiled function whose first call pays the
+    compilation cost; paying it here keeps it out of the timing of whichever test runs first.
+    """
+    params = {
+        "n_modes": 2,
+        "eta_s": 0.5,
+        "eta_i": 0.5,
+        "noise_s": 0.1,
+        "noise_i": 0.1,
+        "sq_0": 0.1,
+        "sq_1": 0.1,
+    }
+    marginal_calcs_2d(forward_solver.twinbeam_pmf(params, cutoff=4))
+    params = {"n_modes": 2, "eta": 0.5, "noise": 0.1, "sq_0": 0.1, "sq_1": 0.1}
+    marginal_calcs_1d(forward_solver.degenerate_pmf(params, cutoff=4))
+    gen_hist_2d(np.zeros(4, dtype=int), np.zeros(4, dtype=int))
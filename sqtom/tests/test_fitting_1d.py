@@ -26,12 +26,12 @@ from sqtom.fitting_1d import (
 
 
 @pytest.mark.parametrize("sq_0", [0.1, 0.5, 1.0])
-def test_gen_hist_1d(sq_0):
+def test_gen_hist_1d(sq_0, rng):
     """Check that a histogram is constructed correctly for a degenerate squeezing source"""
     nsamples = 1_000_000
     q = 1.0 - np.tanh(np.arcsinh(np.sqrt(sq_0))) ** 2
     r = 0.5
-    samples = 2 * np.random.negative_binomial(r, q, size=nsamples)
+    samples = 2 * rng.negative_binomial(r, q, size=nsamples)
     nmax = max(samples)
     expected_pmf = degenerate_pmf({"sq_0": sq_0, "n_modes": 1}, cutoff=nmax)
     pmf = gen_hist_1d(samples)
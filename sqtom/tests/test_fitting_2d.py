@@ -24,41 +24,91 @@ from sqtom.fitting_2d import (
     threshold_2d,
 )
 
+NSAMPLES = 50_000
+TWIN_SQ = [0.1, 1.0, 2.0]
+# Geometric pair numbers for every squeezing at once, obtained by inverting the cdf of uniform draws
+TWIN_SAMPLES = np.floor(
+    np.log1p(-np.random.default_rng(1234).random((len(TWIN_SQ), NSAMPLES)))
+    / np.log1p(-1.0 / (1.0 + np.array(TWIN_SQ)))[:, np.newaxis]
+).astype(np.int64)
 
-@pytest.mark.parametrize("sq_0", [0.1, 1.0, 2.0])
+
+def _ref_hist2d(beam1, beam2):
+    """Reference joint histogram of integer events obtained by tallying every event pair"""
+    counts = np.zeros((int(beam1.max()) + 1, int(beam2.max()) + 1))
+    np.add.at(counts, (beam1, beam2), 1)
+    return counts / beam1.size
+
+
+@pytest.mark.parametrize("sq_0", TWIN_SQ)
 def test_gen_hist_2d_twin(sq_0):
     """Check that a histogram is constructed correctly for a lossless pure twin-beam source"""
-    nsamples = 1000000
-    p = 1 / (1.0 + sq_0)
-    samples = np.random.geometric(p, nsamples) - 1
+    samples = TWIN_SAMPLES[TWIN_SQ.index(sq_0)]
     mat = gen_hist_2d(samples, samples)
+    assert np.allclose(mat, _ref_hist2d(samples, samples), rtol=0, atol=1e-12)
     n, m = mat.shape
     assert n == m
     expected = twinbeam_pmf({"sq_0": sq_0, "n_modes": 1}, cutoff=n)
-    assert np.allclose(mat, expected, atol=0.01)
+    atol = 5 * np.sqrt(expected.max() / NSAMPLES)
+    assert np.allclose(mat, expected, atol=atol)
 
 
-@pytest.mark.parametrize("ns", [0.1, 1.0, 2.0])
-@pytest.mark.parametrize("ni", [0.1, 1.0, 2.0])
-def test_gen_hist_2d_poisson(ns, ni):
+# The statistics are symmetric under exchange of signal and idler, so only ns <= ni is tested
+@pytest.mark.parametrize(
+    "ns, ni", [(0.1, 0.1), (0.1, 1.0), (0.1, 2.0), (1.0, 1.0), (1.0, 2.0), (2.0, 2.0)]
+)
+def test_gen_hist_2d_poisson(ns, ni, rng):
     """Test the histograms are correctly generated for pure noise"""
-    nsamples = 1000000
-    mat = gen_hist_2d(np.random.poisson(ns, nsamples), np.random.poisson(ni, nsamples))
+    samples = rng.poisson([[ns], [ni]], size=(2, NSAMPLES))
+    mat = gen_hist_2d(samples[0], samples[1])
+    assert np.allclose(mat, _ref_hist2d(samples[0], samples[1]), rtol=0, atol=1e-12)
     n, m = mat.shape
-    nmax = np.max([n, m])
     expected = twinbeam_pmf({"noise_s": ns, "noise_i": ni})[:n, :m]
-    np.allclose(expected, mat, atol=0.01)
+    atol = 5 * np.sqrt(expected.max() / NSAMPLES)
+    assert np.allclose(expected, mat, atol=atol)
+
+
+def test_gen_hist_2d_mismatched_beams():
+    """Test that beams with a different number of events are rejected"""
+    with pytest.raises(ValueError, match="same number of events"):
+        gen_hist_2d([0, 1, 2, 1], [1])
 
 
-@pytest.mark.parametrize("eta_s", [0.1, 0.5, 1.0])
-@pytest.mark.parametrize("eta_i", [0.1, 0.5, 1.0])
-@pytest.mark.parametrize("sq_0", [0.0, 0.1, 1.0, 2.0])
-@pytest.mark.parametrize("sq_1", [0.1, 1.0, 2.0])
+def test_gen_hist_2d_negative_events():
+    """Test that negative photon numbers are rejected"""
+    with pytest.raises(ValueError, match="non-negative"):
+        gen_hist_2d([0, 1, 2, 1], [1, -1, 0, 0])
+
+
+# The guess is symmetric under exchange of signal and idler and of the two Schmidt modes,
+# so only eta_s <= eta_i and sq_0 <= sq_1 are tested
+@pytest.mark.parametrize(
+    "eta_s, eta_i", [(0.1, 0.1), (0.1, 0.5), (0.1, 1.0), (0.5, 0.5), (0.5, 1.0), (1.0, 1.0)]
+)
+@pytest.mark.parametrize(
+    "sq_0, sq_1",
+    [
+        (0.0, 0.1),
+        (0.0, 1.0),
+        (0.0, 2.0),
+        (0.1, 0.1),
+        (0.1, 1.0),
+        (0.1, 2.0),
+        (1.0, 1.0),
+        (1.0, 2.0),
+        (2.0, 2.0),
+    ],
+)
 def test_two_schmidt_mode_guess_exact(eta_s, eta_i, sq_0, sq_1):
     """Test that one can invert correctly when there are two Schmidt modes
     and no dark counts.
     """
-    pmf = twinbeam_pmf({"sq_0": sq_0, "sq_1": sq_1, "n_modes": 2, "eta_s": eta_s, "eta_i": eta_i})
+    # The guess only depends on low order moments, whose truncation error for M <= 4
+    # at cutoff 40 is below 1e-3
+    cutoff = 40
+    pmf = twinbeam_pmf(
+        {"sq_0": sq_0, "sq_1": sq_1, "n_modes": 2, "eta_s": eta_s, "eta_i": eta_i}, cutoff=cutoff
+    )
     guess = two_schmidt_mode_guess(pmf)
     assert np.allclose(eta_s, guess["eta_s"], atol=1.0e-2)
     assert np.allclose(eta_i, guess["eta_i"], atol=1.0e-2)
@@ -72,7 +122,7 @@ def test_two_schmidt_mode_guess_exact(eta_s, eta_i, sq_0, sq_1):
 @pytest.mark.parametrize("do_not_vary", ["eta_s", "noise_s", "eta_i", "noise_i", None])
 @pytest.mark.parametrize("n_modes", [1, 2, 3])
 @pytest.mark.parametrize("threshold", [False, 5])
-def test_exact_model_2d(n_modes, do_not_vary, threshold):
+def test_exact_model_2d(n_modes, do_not_vary, threshold, pmf_cache):
     """Test that the fitting is correct when the guess is exactly the correct answer"""
     sq_n = 0.7 * (0.5 ** np.arange(n_modes))
     noise_s = 0.1
@@ -86,9 +136,9 @@ def test_exact_model_2d(n_modes, do_not_vary, threshold):
     params["noise_s"] = noise_s
     params["noise_i"] = noise_i
     if threshold:
-        probs = threshold_2d(twinbeam_pmf(params), threshold, threshold)
+        probs = threshold_2d(pmf_cache(params), threshold, threshold)
     else:
-        probs = twinbeam_pmf(params)
+        probs = pmf_cache(params)
     fit = fit_2d(probs, params, do_not_vary=do_not_vary, threshold=threshold)
     assert np.allclose(fit.chisqr, 0.0)
 
@@ -100,3 +150,16 @@ def test_marginal_calcs_2d():
     res = marginal_calcs_2d(ps, as_dict=False)
     expected = np.array([nmean, nmean, 2 + 1 / nmean, 2, 2, 0])
     assert np.allclose(res, expected)
+
+
+def test_marginal_calcs_2d_nrf():
+    """Tests the noise reduction factor of an asymmetric, non-square pmf against explicit sums"""
+    ps = np.arange(1.0, 13.0).reshape(3, 4) ** 2
+    ps /= np.sum(ps)
+    n_s = sum(i * ps[i, j] for i in range(3) for j in range(4))
+    n_i = sum(j * ps[i, j] for i in range(3) for j in range(4))
+    mean_diff = sum((i - j) * ps[i, j] for i in range(3) for j in range(4))
+    var_diff = sum((i - j - mean_diff) ** 2 * ps[i, j] for i in range(3) for j in range(4))
+    res = marginal_calcs_2d(ps)
+    assert np.allclose(res["nrf"], var_diff / (n_s + n_i))
+    assert np.allclose(marginal_calcs_2d(ps.T)["nrf"], var_diff / (n_s + n_i))
@@ -18,33 +18,39 @@
 
 """Basic tests for the functions in forward_solver"""
 import numpy as np
-from scipy.stats import geom
-from sqtom.forward_solver import twinbeam_pmf, loss_mat, degenerate_pmf
+from scipy.stats import nbinom
+from sqtom.forward_solver import twinbeam_pmf, degenerate_pmf
 from sqtom.fitting_1d import marginal_calcs_1d
-from sqtom.fitting_2d import marginal_calcs_2d, two_schmidt_mode_guess, gen_hist_2d
+from sqtom.fitting_2d import marginal_calcs_2d
 import pytest
 
 
 # pylint: disable=too-many-locals
-@pytest.mark.parametrize("sq_0", [0.0, 0.1, 1.0])
-@pytest.mark.parametrize("sq_1", [0.1, 2.0])
-@pytest.mark.parametrize("noise_s", [0.2, 0.5])
-@pytest.mark.parametrize("noise_i", [0.2, 0.5])
-@pytest.mark.parametrize("eta_s", [0.1, 1.0])
-@pytest.mark.parametrize("eta_i", [0.1, 1.0])
-def test_twin_correct_stats(sq_0, sq_1, noise_s, noise_i, eta_s, eta_i):
+@pytest.mark.parametrize("seed", range(4))
+def test_twin_correct_stats(seed):
     """Test that dark counts are correctly included by calculating expected g2s and mean photon numbers"""
     cutoff = 40
-    params = {
-        "n_modes": 2,
-        "eta_s": eta_s,
-        "eta_i": eta_i,
-        "noise_s": noise_s,
-        "noise_i": noise_i,
-        "sq_0": sq_0,
-        "sq_1": sq_1,
-    }
-    pmf = twinbeam_pmf(params, cutoff=cutoff)
+    num_draws = 8
+    rng = np.random.default_rng(seed)
+    sq_0 = rng.uniform(0.0, 1.0, num_draws)
+    # Always include a single Schmidt mode, for which K = 1 and the noiseless g2 is 2
+    sq_0[0] = 0.0
+    sq_1 = rng.uniform(0.1, 2.0, num_draws)
+    noise_s, noise_i = rng.uniform(0.2, 0.5, (2, num_draws))
+    eta_s, eta_i = rng.uniform(0.1, 1.0, (2, num_draws))
+    param_grid = [
+        {
+            "n_modes": 2,
+            "eta_s": eta_s[k],
+            "eta_i": eta_i[k],
+            "noise_s": noise_s[k],
+            "noise_i": noise_i[k],
+            "sq_0": sq_0[k],
+            "sq_1": sq_1[k],
+        }
+        for k in range(num_draws)
+    ]
+    pmfs = np.array([twinbeam_pmf(params, cutoff=cutoff) for params in param_grid])
     K = (sq_0 + sq_1) ** 2 / (sq_0 ** 2 + sq_1 ** 2)
     M = sq_0 + sq_1
     g2noiseless = 1.0 + 1.0 / K
@@ -52,26 +58,55 @@ def test_twin_correct_stats(sq_0, sq_1, noise_s, noise_i, eta_s, eta_i):
     eps_i = noise_i / (eta_i * M)
     g2s = (g2noiseless + 2 * eps_s + eps_s ** 2) / (1.0 + 2 * eps_s + eps_s ** 2)
     g2i = (g2noiseless + 2 * eps_i + eps_i ** 2) / (1.0 + 2 * eps_i + eps_i ** 2)
-    marginals = marginal_calcs_2d(pmf)
-    np.allclose(g2s, marginals["g2_s"])
-    np.allclose(g2i, marginals["g2_i"])
-    np.allclose(noise_s + eta_s * M, marginals["n_s"])
-    np.allclose(noise_i + eta_i * M, marginals["n_i"])
+    marginals = np.array([marginal_calcs_2d(pmf, as_dict=False) for pmf in pmfs])
+    expected = np.stack([noise_s + eta_s * M, noise_i + eta_i * M, g2s, g2i])
+    # Rows of the marginals are n_s, n_i, g11, g2_s, g2_i, nrf
+    actual = marginals.T[[0, 1, 3, 4]]
+    # Truncating at the Fock cutoff shifts the moments of the largest squeezings by up to ~3e-5
+    assert np.allclose(expected, actual, atol=1e-4)
 
 
-@pytest.mark.parametrize("eta", [0.1, 0.5, 1.0])
 @pytest.mark.parametrize("sq_0", [0.0, 0.1, 1.0, 2.0])
-@pytest.mark.parametrize("sq_1", [0.1, 1.0, 2.0])
-@pytest.mark.parametrize("noise", [0.2, 0.5])
-def test_degenerate_correct_stats(eta, sq_0, sq_1, noise):
+def test_pmf_single_schmidt_twinbeam(sq_0):
+    """Test that a single lossless twin beam has a geometric distribution along the diagonal"""
+    cutoff = 50
+    pmf = twinbeam_pmf({"n_modes": 1, "sq_0": sq_0}, cutoff=cutoff)
+    # Thermal distribution of the pair number n with mean sq_0
+    n = np.arange(cutoff)
+    expected = np.diag(sq_0 ** n / (1.0 + sq_0) ** (n + 1))
+    assert np.allclose(pmf, expected)
+
+
+@pytest.mark.parametrize("sq_0", [0.0, 0.1, 1.0, 2.0])
+@pytest.mark.parametrize("cutoff", [1, 2, 9, 10, 49, 50])
+def test_pmf_single_mode_degenerate(sq_0, cutoff):
+    """Test that a single lossless degenerate squeezer emits photons in pairs following a
+    negative binomial distribution"""
+    ps = degenerate_pmf({"n_modes": 1, "sq_0": sq_0}, cutoff=cutoff)
+    expected = np.zeros(cutoff)
+    expected[0::2] = nbinom.pmf(np.arange((cutoff + 1) // 2), 0.5, 1.0 / (1.0 + sq_0))
+    assert ps.shape == (cutoff,)
+    assert np.allclose(ps, expected, rtol=1e-12, atol=1e-15)
+
+
+def test_degenerate_correct_stats():
     """Test that the g2 of a single mode degenerate squeezer is 3+1/n regardless of the loss, where n is the mean photon number"""
-    params = {"n_modes": 2, "eta": eta, "noise": noise, "sq_0": sq_0, "sq_1": sq_1}
-    ps = degenerate_pmf(params)
-    vals = marginal_calcs_1d(ps)
+    eta, sq_0, sq_1, noise = (
+        grid.ravel()
+        for grid in np.meshgrid(
+            [0.1, 0.5, 1.0], [0.0, 0.1, 1.0, 2.0], [0.1, 1.0, 2.0], [0.2, 0.5], indexing="ij"
+        )
+    )
+    param_grid = [
+        {"n_modes": 2, "eta": eta[k], "noise": noise[k], "sq_0": sq_0[k], "sq_1": sq_1[k]}
+        for k in range(eta.size)
+    ]
+    vals = np.array(
+        [marginal_calcs_1d(degenerate_pmf(params), as_dict=False) for params in param_grid]
+    )
     K = (sq_0 + sq_1) ** 2 / (sq_0 ** 2 + sq_1 ** 2)
     M = sq_0 + sq_1
     g2noiseless = 1.0 + 1.0 / M + 2.0 / K
     eps = noise / (eta * M)
     g2 = (g2noiseless + 2 * eps + eps ** 2) / (1 + 2 * eps + eps ** 2)
-    assert np.allclose(vals["g2"], g2, atol=0.05)
-    assert np.allclose(vals["n"], eta * M + noise, atol=0.05)
+    assert np.allclose(np.stack([eta * M + noise, g2]), vals.T, atol=0.05)